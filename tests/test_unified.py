@@ -125,9 +125,8 @@ def prepare_pmeter(pmeter):
     assert pmeter.command("get-integration-state") == "reset"
     assert pmeter.command("set-smoothing-status", "off") is None
 
-@pytest.fixture(params=[PowerMeter.PowerMeter, YokotoolPowerMeter])
-def pmeter(devspec, request):
-    """Returns a 'PowerMeter' class instance for the given device node."""
+def get_config(devspec):
+    """Returns the power meter configuration for the given device node or section name."""
 
     args = CmdLineArgs()
     secname = None
@@ -136,7 +135,13 @@ def pmeter(devspec, request):
     else:
         secname = devspec
 
-    config = Config.parse_config_files(secname=secname, overrides=args)
+    return Config.parse_config_files(secname=secname, overrides=args)
+
+@pytest.fixture(params=[PowerMeter.PowerMeter, YokotoolPowerMeter])
+def pmeter(devspec, request):
+    """Returns a 'PowerMeter' class instance for the given device node."""
+
+    config = get_config(devspec)
     pmeter = request.param(**config)
     prepare_pmeter(pmeter)
     yield pmeter
@@ -265,6 +270,26 @@ def test_integration(pmeter):
         pmeter.command("reset-integration")
         assert pmeter.command("get-integration-state") == "reset"
 
+def test_pipelined_integration_state(devspec):
+    """
+    Verify the integration state in the pipelined mode. WT210 has no integration state command and
+    detects the state by checking whether a command fails, which must not be deferred.
+    """
+
+    pmeter = PowerMeter.PowerMeter(pipelined=True, **get_config(devspec))
+    try:
+        prepare_pmeter(pmeter)
+
+        pmeter.command("start-integration")
+        assert "start" in pmeter.command("get-integration-state")
+        pmeter.command("stop-integration")
+        assert "stop" in pmeter.command("get-integration-state")
+        pmeter.command("reset-integration")
+        assert pmeter.command("get-integration-state") == "reset"
+        pmeter.flush()
+    finally:
+        pmeter.close()
+
 def test_bad_command(pmeter):
     """Verify that bad power meter commands raise an exception."""
 
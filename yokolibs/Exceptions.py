@@ -25,6 +25,17 @@ class Error(Exception):
         """The string representation of the exception."""
         return self.msg
 
+class ErrorBadCommand(Error):
+    """This exception is thrown when the command is not supported by the power meter."""
+
+    def __init__(self, cmd, msg=None):
+        """The class constructor."""
+
+        if not msg:
+            msg = "bad command '%s'" % cmd
+        super(ErrorBadCommand, self).__init__(msg)
+        self.cmd = cmd
+
 class ErrorBadArgument(Error):
     """This exception is thrown when the argument for a command is incorrect."""
 
@@ -24,7 +24,7 @@ from collections import OrderedDict
 from yokolibs import Transport, _wt310, _wt210
 from yokolibs.Config import CONFIG_OPTIONS as _KWARGS
 # pylint: disable=unused-import
-from yokolibs.Exceptions import Error, ErrorBadArgument, ErrorBadResponse
+from yokolibs.Exceptions import Error, ErrorBadCommand, ErrorBadArgument, ErrorBadResponse
 from yokolibs._yokobase import COMMANDS
 # pylint: enable=unused-import
 
@@ -43,13 +43,12 @@ class PowerMeter:
     def get_argument_help(self, cmd):
         """Return a user-friendly help message for the power meter command 'cmd'."""
 
-        if cmd not in self.commands:
+        info = self.commands.get(cmd)
+        if info is None:
             raise Error("command '%s' does not support arguments" % cmd)
 
-        if self.commands[cmd]["value-descr"]:
-            return self.commands[cmd]["value-descr"]
-        if self.commands[cmd]["choices"]:
-            return ", ".join(self.commands[cmd]["choices"])
+        if info["argument-help"]:
+            return info["argument-help"]
 
         raise Error("no help text for '%s'" % cmd)
 
@@ -84,12 +83,15 @@ class PowerMeter:
 
         raise Error("\n".join(lines))
 
-    def __init__(self, transport=None, **kwargs):
+    def __init__(self, transport=None, pipelined=False, **kwargs):
         """
         The class constructor. The optional 'transport' argument specifies the transport object to
         use. If it is not provided, the rest of the arguments are used to create the transport. The
         allowed keys in 'kwargs' are the same as the configuration file options (e.g., 'devnode',
         etc).
+
+        If 'pipelined' is 'True', the error status of a command without a response is checked only
+        when the next command is executed or 'flush()' is called, so an error is reported later.
         """
 
         # Validate kwargs.
@@ -129,6 +131,8 @@ class PowerMeter:
             if not self._pmeter:
                 self._probe_error(errors)
 
+        self._pmeter.pipelined = pipelined
+
     def __del__(self):
         """The class destructor."""
 
@@ -47,9 +47,14 @@ class _TransportBase():
     # Name of this transport.
     name = None
 
-    def _dbg(self, message):
-        """Print a debug message."""
-        self._log.debug("%s: %s", self.devnode, message.rstrip())
+    def _dbg(self, what, data):
+        """
+        Print a debug message about 'data' sent to or received from the device. This is done for
+        every line, so do not format anything unless debug messages are enabled.
+        """
+
+        if self._log.isEnabledFor(logging.DEBUG):
+            self._log.debug("%s: %s: %s", self.devnode, what, data.rstrip())
 
     def readline(self):
         """Abstract method to be implemented in child classes."""
@@ -121,24 +126,23 @@ class _USBTMC(_TransportBase):
         except OSError as err:
             raise TransportError("error while writing to device '%s':\n%s" % (self.devnode, err))
 
-        self._dbg("sent: %s" % data)
+        self._dbg("sent", data)
 
     def readline(self):
         """Read a line from the device."""
 
         try:
-            data = os.read(self._fd, 4096).decode("utf-8")
+            data = os.read(self._fd, 4096)
         except OSError as err:
             raise TransportError("error while reading from device '%s':\n%s" % (self.devnode, err))
 
-        if not isinstance(data, str):
-            try:
-                data = str(data.decode("utf-8"))
-            except UnicodeError as err:
-                raise TransportError("failed to decode unicode response:\n%s" % err)
+        try:
+            data = data.decode("utf-8")
+        except UnicodeError as err:
+            raise TransportError("failed to decode unicode response:\n%s" % err)
 
         data = data.strip()
-        self._dbg("received: %s" % data)
+        self._dbg("received", data)
         return data
 
     def set_timeout(self, timeout):
@@ -196,26 +200,40 @@ class _Serial(_TransportBase):
         except self._serial.SerialException as err:
             raise TransportError("error while writing to device '%s':\n%s" % (self.devnode, err))
 
-        self._dbg("sent: %s" % data)
+        self._dbg("sent", data)
 
     def readline(self):
         """Read a line from the device."""
 
+        # Instead of reading the response byte-by-byte, wait for at least one byte and then read
+        # everything the device has sent so far. The bytes after the end of the line are kept for
+        # the next 'readline()' call. On errors, drop the partially read line, otherwise it would
+        # corrupt the next response.
         try:
-            data = self._ser.readline()
-            if not data:
-                raise TransportError("time out while reading from device '%s'" % self.devnode)
+            end = self._buf.find(b"\n")
+            while end < 0:
+                chunk = self._ser.read(max(1, self._ser.in_waiting))
+                if not chunk:
+                    self._buf = b""
+                    raise TransportError("time out while reading from device '%s'" % self.devnode)
+                end = chunk.find(b"\n")
+                if end >= 0:
+                    end += len(self._buf)
+                self._buf += chunk
         except self._serial.SerialException as err:
+            self._buf = b""
             raise TransportError("error while reading from device '%s':\n%s" % (self.devnode, err))
 
-        if not isinstance(data, str):
-            try:
-                data = str(data.decode("utf-8"))
-            except UnicodeError as err:
-                raise TransportError("failed to decode unicode response:\n%s" % err)
+        data = self._buf[:end + 1]
+        self._buf = self._buf[end + 1:]
+
+        try:
+            data = data.decode("utf-8")
+        except UnicodeError as err:
+            raise TransportError("failed to decode unicode response:\n%s" % err)
 
         data = data.strip()
-        self._dbg("received: %s" % data)
+        self._dbg("received", data)
         return data
 
     def __init__(self, devnode, **kwargs):
@@ -228,6 +246,8 @@ class _Serial(_TransportBase):
 
         self._ser = None
         self._serial = serial
+        # The bytes read from the device, but not returned by 'readline()' yet.
+        self._buf = b""
         try:
             self._ser = serial.Serial()
         except serial.SerialException as err:
@@ -252,6 +272,13 @@ class _Serial(_TransportBase):
         except serial.SerialException as err:
             raise TransportError("cannot initialize the serial device '%s':\n%s" % (devnode, err))
 
+        # Ask the driver to deliver the received bytes without delay (e.g., USB-to-serial adapters
+        # may otherwise hold them for up to 16ms). This is just an optimization, so ignore errors.
+        try:
+            self._ser.set_low_latency_mode(True)
+        except (AttributeError, ValueError, IOError) as err:
+            self._log.debug("cannot enable low latency mode for '%s': %s", devnode, err)
+
     def __del__(self):
         """The class destructor."""
         self.close()
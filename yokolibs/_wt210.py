@@ -100,13 +100,21 @@ def _math_response_tweak(_, value):
 
     raise Error("unknown power meter math function '%s'" % value)
 
+def _smoothing_type_tweak(_, value):
+    """Extract the smoothing type from the 'type,factor' response."""
+    return value.partition(",")[0]
+
+def _smoothing_factor_tweak(_, value):
+    """Extract the smoothing factor from the 'type,factor' response."""
+    return value.split(",")[1]
+
 # The tweaks.
 _TWEAKS = {
     "get-smoothing-type" : {
-        "response-tweaks" : (_yokobase.to_lower_tweak, lambda _, x: x.split(",")[0]),
+        "response-tweaks" : (_yokobase.to_lower_tweak, _smoothing_type_tweak),
     },
     "get-smoothing-factor" : {
-        "response-tweaks" : (_yokobase.to_lower_tweak, lambda _, x: x.split(",")[1]),
+        "response-tweaks" : (_yokobase.to_lower_tweak, _smoothing_factor_tweak),
     },
     "get-math" : {
         "response-tweaks" : (_math_response_tweak,),
@@ -116,6 +124,8 @@ _TWEAKS = {
 class WT210(_yokobase.YokoBase):
     """This class implements Yokogawa WT210 power meter."""
 
+    __slots__ = ("pmtype", "_wt210_item_indexes", "_wt210_items_to_read")
+
     pmtypes = ("wt210", )
     name = "Yokogawa WT210"
 
@@ -176,6 +186,7 @@ class WT210(_yokobase.YokoBase):
 
         self._wt210_items_to_read = items
         items = set(items)
+        set_cmds = self._commands[cmd]["set-cmds"]
         self._wt210_item_indexes = {}
         idx = 0
         for item in self._data_items:
@@ -184,9 +195,9 @@ class WT210(_yokobase.YokoBase):
             if item in items:
                 self._wt210_item_indexes[item] = idx
                 idx += 1
-                self._command("set-data-item-%s" %  item, "on")
+                self._command(set_cmds[item], "on")
             else:
-                self._command("set-data-item-%s" %  item, "off")
+                self._command(set_cmds[item], "off")
 
     def _get_data_tweak(self, cmd, response):
         """Process the data returned by the 'get-data' command."""
@@ -199,9 +210,8 @@ class WT210(_yokobase.YokoBase):
             else:
                 items.append(str(item))
 
-        result = []
-        for item in self._wt210_items_to_read:
-            result.append(items[self._wt210_item_indexes[item]])
+        indexes = self._wt210_item_indexes
+        result = [items[indexes[item]] for item in self._wt210_items_to_read]
 
         return super(WT210, self)._get_data_tweak(cmd, result)
 
@@ -216,15 +226,19 @@ class WT210(_yokobase.YokoBase):
 
         super(WT210, self)._populate_raw_commands(raw_commands)
 
-        # Cover the data item get/set commands as well.
+        # Cover the data item get/set commands as well. Remember the set command names so that
+        # 'configure-data-items' does not have to build them every time.
+        set_cmds = {}
         for cmd_part, get_cmd, set_cmd in self._iter_data_item_commands():
-            name = self._ditt["htop"].get(cmd_part, cmd_part)
+            name = self._htop.get(cmd_part, cmd_part)
             self._commands[get_cmd] = {}
             self._commands[get_cmd]["raw-cmd"] = ":MEAS:ITEM:%s?" % name
             self._commands[set_cmd] = {}
             self._commands[set_cmd]["raw-cmd"] = ":MEAS:ITEM:%s" % name
+            set_cmds[cmd_part] = set_cmd
 
         self._add_command_func("configure-data-items", self._configure_data_items_cmd)
+        self._commands["configure-data-items"]["set-cmds"] = set_cmds
         self._add_command_func("set-smoothing-type", self._set_smoothing_cmd)
         self._add_command_func("set-smoothing-factor", self._set_smoothing_cmd)
         self._add_command_func("get-integration-state", self._get_integration_state_cmd)
@@ -232,6 +246,10 @@ class WT210(_yokobase.YokoBase):
 
         self._populate_raw_commands_post()
 
+        # The math function query response contains semicolons, so it cannot be a part of a
+        # compound query.
+        self._commands["get-math"]["batchable"] = False
+
     def __init__(self, transport):
         """The class constructor."""
 
@@ -251,6 +269,7 @@ class WT210(_yokobase.YokoBase):
         self._populate_raw_commands(_RAW_COMMANDS)
         self._populate_tweaks(_TWEAKS)
         self._populate_arg_verify_funcs()
+        self._populate_flags()
         self._populate_errors_map_map()
 
         try:
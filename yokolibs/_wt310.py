@@ -15,6 +15,7 @@ only one input element is supported.
 
 from __future__ import absolute_import, division, print_function
 import re
+import functools
 from collections import OrderedDict
 from yokolibs import _yokobase
 from yokolibs.Exceptions import Error
@@ -47,7 +48,14 @@ _DITT = (
 )
 
 # WT310 requires these math functions to end with the element number, e.g., cfv1.
-_MATH_NAMES_WITH_ELEMENTS = set(("cfv", "cfi", "avw"))
+_MATH_NAMES_WITH_ELEMENTS = frozenset(("cfv", "cfi", "avw"))
+# The (number, get command, set command) tuples for every data item number. Build the command names
+# once and use the same string objects both as the commands dictionary keys and for looking the
+# commands up, which makes the lookups a little cheaper.
+_DATA_ITEM_CMDS = tuple((num, "get-data-item%d" % num, "set-data-item%d" % num)
+                        for num in range(1, _MAX_DATA_ITEMS + 1))
+# Splits a math function name into the name and the element number parts.
+_MATH_ELEMENT_RE = re.compile(r"([^\d]*)(\d+)$")
 
 # Commands.
 _RAW_COMMANDS = (
@@ -113,9 +121,15 @@ _CHOICES = (
 def _math_response_tweak(_, value):
     """Remove the element number part from a math function name."""
 
-    match = re.search(r"([^\d]*)(\d+)$", value)
-    if match:
-        value = match.group(1)
+    # The response is usually a plain name with no number or a name followed by a single digit
+    # element number, handle these cases without the regular expression.
+    if value[-1:].isdigit():
+        if value[:-1].isalpha():
+            value = value[:-1]
+        else:
+            match = _MATH_ELEMENT_RE.search(value)
+            if match:
+                value = match.group(1)
     if value.startswith("cfu"):
         value = "cfv" + value[3:]
     return value
@@ -154,6 +168,24 @@ _TWEAKS = {
     },
 }
 
+@functools.lru_cache(maxsize=256)
+def _is_valid_math_name(name, choices):
+    """
+    Return 'True' if 'name' is a valid math function name, optionally followed by the element
+    number, and 'False' otherwise. The 'choices' argument is the frozenset of valid math function
+    names. The result depends only on the arguments, so it is cached.
+    """
+
+    match = _MATH_ELEMENT_RE.search(name)
+    if match:
+        if not _yokobase.is_in_range(match.group(2), 1, _ELEMENTS_COUNT):
+            return False
+        name = match.group(1)
+        if name not in _MATH_NAMES_WITH_ELEMENTS:
+            return False
+
+    return name in choices
+
 def _verify_data_items_count(item):
     """Verify whether or not the amount of data items range from 1 to '_MAX_DATA_ITEMS'."""
 
@@ -162,6 +194,8 @@ def _verify_data_items_count(item):
 class WT310(_yokobase.YokoBase):
     """This class implements Yokogawa WT310 power meter."""
 
+    __slots__ = ("_pmtype", "pmtype")
+
     pmtypes = ("wt310", "wt330", "wt332", "wt333")
     name = "Yokogawa WT310 or WT33x"
 
@@ -174,24 +208,12 @@ class WT310(_yokobase.YokoBase):
         if name is None:
             return False
 
-        match = re.search(r"([^\d]*)(\d+)$", name)
-        if match:
-            if not _yokobase.is_in_range(match.group(2), 1, _ELEMENTS_COUNT):
-                return False
-            name = match.group(1)
-            if name not in _MATH_NAMES_WITH_ELEMENTS:
-                return False
-
-        if name not in self.commands["set-math"]["choices-set"]:
-            return False
-
-        return True
+        return _is_valid_math_name(name, self._commands["set-math"]["choices-set"])
 
     def _iter_data_item_commands(self):
-        """Yield the (cmd_part, get_cmd, set_cmd) tuples for each possible data item command."""
+        """Return the (cmd_part, get_cmd, set_cmd) tuples for each possible data item command."""
 
-        for num in range(1, self.max_data_items + 1):
-            yield (num, "get-data-item%d" % num, "set-data-item%d" % num)
+        return _DATA_ITEM_CMDS[:self.max_data_items]
 
     def _configure_data_items_cmd(self, cmd, items):
         """Set the data items that the power meter will return on the next read command."""
@@ -200,8 +222,8 @@ class WT310(_yokobase.YokoBase):
 
         if items:
             self._command("set-data-items-count", len(items))
-            for idx, data_item in enumerate(items, 1):
-                self._command("set-data-item%d" % idx, data_item)
+            for data_item, (_, _, set_cmd) in zip(items, _DATA_ITEM_CMDS):
+                self._command(set_cmd, data_item)
 
     def _get_data_tweak(self, cmd, response):
         """Process the data returned by the 'get-data' command."""
@@ -212,23 +234,22 @@ class WT310(_yokobase.YokoBase):
     def _add_wt310_commands(self):
         """Add WT310-specific commands."""
 
-        self.commands["get-integration-state"] = {
-            "property-descr" : "integration state",
-            "descr" : "get the integration feature state",
-        }
-        self.commands["get-keys-locking"] = {
-            "property-descr" : "keys lock status",
-            "descr" : "check whether device's physical keys are locked or not",
-        }
-        self.commands["set-keys-locking"] = {
-            "property-descr" : "keys lock status",
-            "descr" : "lock/unlock device's physical keys",
-        }
-
-        # Add commands for getting and setting data items.
-        for _, get_cmd, set_cmd in self._iter_data_item_commands():
-            self._commands[get_cmd] = {}
-            self._commands[set_cmd] = {}
+        commands = OrderedDict([
+            ("get-integration-state", {
+                "property-descr" : "integration state",
+                "descr" : "get the integration feature state",
+            }),
+            ("get-keys-locking", {
+                "property-descr" : "keys lock status",
+                "descr" : "check whether device's physical keys are locked or not",
+            }),
+            ("set-keys-locking", {
+                "property-descr" : "keys lock status",
+                "descr" : "lock/unlock device's physical keys",
+            }),
+        ])
+        for cmd, info in commands.items():
+            self._commands[cmd] = self._public_commands[cmd] = info
 
     def _populate_arg_verify_funcs(self):
         """Populate the 'self._commands' dictionary with command verification functions."""
@@ -241,12 +262,12 @@ class WT310(_yokobase.YokoBase):
 
         super(WT310, self)._populate_raw_commands(raw_commands)
 
-        # Cover the data item get/set commands as well.
-        for cmd_part, get_cmd, set_cmd in self._iter_data_item_commands():
-            self._commands[get_cmd] = {}
-            self._commands[get_cmd]["raw-cmd"] = ":NUM:NORM:ITEM%d?" % cmd_part
-            self._commands[set_cmd] = {}
-            self._commands[set_cmd]["raw-cmd"] = ":NUM:NORM:ITEM%d" % cmd_part
+        # Add the commands for getting and setting data items.
+        data_item_cmds = self._iter_data_item_commands()
+        self._commands.update({get_cmd : {"raw-cmd" : ":NUM:NORM:ITEM%d?" % cmd_part}
+                               for cmd_part, get_cmd, _ in data_item_cmds})
+        self._commands.update({set_cmd : {"raw-cmd" : ":NUM:NORM:ITEM%d" % cmd_part}
+                               for cmd_part, _, set_cmd in data_item_cmds})
 
         self._add_command_func("configure-data-items", self._configure_data_items_cmd)
         self._populate_raw_commands_post()
@@ -266,6 +287,7 @@ class WT310(_yokobase.YokoBase):
         self._populate_raw_commands(_RAW_COMMANDS)
         self._populate_tweaks(_TWEAKS)
         self._populate_arg_verify_funcs()
+        self._populate_flags()
         self._populate_errors_map_map()
 
         self._init_pmeter()
@@ -20,9 +20,11 @@ should be based on this module.
 from __future__ import absolute_import, division, print_function
 import time
 import logging
+import functools
+from types import MappingProxyType
 from collections import OrderedDict
 from yokolibs import Transport
-from yokolibs.Exceptions import Error, ErrorBadArgument, ErrorBadResponse
+from yokolibs.Exceptions import Error, ErrorBadCommand, ErrorBadArgument, ErrorBadResponse
 
 # This makes sure all classes are the new-style classes by default.
 __metaclass__ = type # pylint: disable=invalid-name
@@ -33,6 +35,13 @@ _LOG = logging.getLogger("_yokobase")
 # function exit.
 _CMD_CONTINUE = object
 
+# The bits of the "flags" value of the 'self._commands' entries.
+_HAS_RESPONSE = 1
+_HAS_ARGUMENT = 2
+_HAS_FUNC = 4
+_NEEDS_VERIFY = 8
+_IS_PUBLIC = 16
+
 # The data items supported by all power meters.
 _DATA_ITEMS = OrderedDict([
     ("V", "voltage"),
@@ -75,7 +84,8 @@ _MATH_NAMES = OrderedDict([
     ("avw", "Average active power"),
 ])
 
-# The power meter commands common for all power meters.
+# The power meter commands common for all power meters (read-only, every power meter object copies
+# the command descriptions to its own commands dictionary).
 # * property - whether this command just reads or changes a power meter configuration option or a
 #              property. Can be 'None'.
 # * property-descr - if the command is about reading/changing a property, this is a short human
@@ -85,10 +95,12 @@ _MATH_NAMES = OrderedDict([
 #
 # The following keys are added dynamically when the power meter object is initialized:
 # * choices - list of all the possible values accepted or return by the command. Can be 'None'.
-# * choices-set - same as choices, but of the 'set' type. Can be 'None'.
+# * choices-set - same as choices, but of the 'frozenset' type. Can be 'None'.
 # * value-descr - human-readable text description of the possible values the command returns or
 #                 accepts. Can be 'None'.
-COMMANDS = OrderedDict([
+# * argument-help - the help text for the command argument: 'value-descr' if it is provided, or the
+#                   comma-separated choices otherwise. Can be 'None'.
+COMMANDS = MappingProxyType(OrderedDict([
     ("get-id", {
         "property-descr" : "device ID",
         "descr" : "get the device identification string",
@@ -145,6 +157,10 @@ COMMANDS = OrderedDict([
         "property-descr" : None,
         "descr" : "read power meter data",
     }),
+    ("wait-and-read-data", {
+        "property-descr" : None,
+        "descr" : "wait for data update and read power meter data",
+    }),
     ("get-crest-factor", {
         "property-descr" : "crest factor",
         "descr" : "get crest factor",
@@ -302,7 +318,7 @@ COMMANDS = OrderedDict([
         "property-descr" : "frequency filter status",
         "descr" : "enable or disable the frequency filter",
     }),
-])
+]))
 
 _RAW_COMMANDS = (
     ("get-id", "*IDN?"),
@@ -438,10 +454,18 @@ _EESR_BITS = {
     "poa3": 14, # Peak current on the 3rd element is out of range.
 }
 
+# The transition filter values accepted by the EESR filter commands.
+_EESR_FILTERS = ("rise", "fall", "both", "never")
+
+# The EESR filter command names for every EESR bit.
+_EESR_FILTER_CMDS = {name : "set-eesr-filter-%s" % name for name in _EESR_BITS}
+
 #
 # Power meter's input and output values are not always very human-friendly. Below set of functions,
 # referred to as 'tweaks', transform these values into a human-friendly format, and vice-versa, they
-# also transform human-friendly notations into power meter's format.
+# also transform human-friendly notations into power meter's format. The "raw" input tweaks
+# receive the raw command instead of the command name and return the entire raw command, including
+# the argument.
 #
 
 def on_off_tweak(_, value):
@@ -457,7 +481,8 @@ def to_lower_tweak(_, value):
 
 def _to_lower_capitalize_tweak(_, value):
     """Translate 'value' to lowercase and capitalize it."""
-    return value.lower().capitalize()
+    # Note, 'capitalize()' lowercases the rest of the string by itself.
+    return value.capitalize()
 
 def _float_to_str_tweak(_, value):
     """Translate a float to string dropping superfluous zeros."""
@@ -473,22 +498,30 @@ def _success_failure_tweak(_, value):
 def _csv_to_seconds_tweak(_, value):
     """Convert time from 'h,m,s' CSV format to seconds."""
 
-    seconds = 0
-    for item in value.split(','):
-        seconds = seconds * 60 + int(item)
-    return str(seconds)
+    try:
+        hours, minutes, seconds = value.split(",")
+    except ValueError:
+        # Not the usual 'h,m,s' format, handle any amount of fields.
+        seconds = 0
+        for item in value.split(","):
+            seconds = seconds * 60 + int(item)
+        return str(seconds)
 
-def _seconds_to_csv_tweak(_, value):
-    """Convert time from seconds to 'h,m,s' CSV format."""
+    return str(int(hours) * 3600 + int(minutes) * 60 + int(seconds))
+
+def _seconds_to_csv_raw_tweak(raw_cmd, value):
+    """Convert time from seconds to 'h,m,s' CSV format and append it to 'raw_cmd'."""
 
     minutes, seconds = divmod(int(value), 60)
     hours, minutes = divmod(minutes, 60)
-    return "%d,%d,%d" % (hours, minutes, seconds)
+    return "%s %d,%d,%d" % (raw_cmd, hours, minutes, seconds)
 
 def _first_data_element_tweak(_, value):
     """Remove the ',1' ending from a data item."""
 
-    if value.endswith(",1"):
+    # Compare the last characters directly, which is cheaper than 'endswith()' for these short
+    # strings, especially when there is no match.
+    if len(value) >= 2 and value[-2] == "," and value[-1] == "1":
         return value[:-2]
     return value
 
@@ -549,10 +582,19 @@ _TWEAKS = {
         "response-tweaks" : (_csv_to_seconds_tweak,),
     },
     "set-integration-timer" : {
-        "input-tweaks" : (_seconds_to_csv_tweak,),
+        "input-tweak-raw" : _seconds_to_csv_raw_tweak,
     },
 }
 
+# The commands which results describe the power meter itself and never change, so that they can be
+# cached. The settings (e.g., the crest factor) are not cached, because they may be changed from the
+# front panel in the local mode or by another controller.
+_CACHEABLE_COMMANDS = ("get-id", "get-installed-opts")
+
+# The power meter error queue is read one error at a time. Limit the amount of error status reads
+# when draining the queue, just in case the power meter keeps reporting errors.
+_MAX_QUEUED_ERRORS = 32
+
 # Map a power meter error code into a human-readable message. We do not cover all codes here so far.
 _ERROR_CODES_MAP = {
     813 : {"msg" : "operation is not allowed during integration, please reset integration first"},
@@ -561,13 +603,12 @@ _ERROR_CODES_MAP = {
 def is_in_range(value, start=0, stop=0):
     """Verify whether or not a string 'value' contains an integer in the [min, max] range."""
 
-    try:
-        value = int(value)
-    except (ValueError, TypeError):
-        return False
-    if value < start or value > stop:
-        return False
-    return True
+    if type(value) is not int:
+        try:
+            value = int(value)
+        except (ValueError, TypeError):
+            return False
+    return start <= value <= stop
 
 def _verify_integration_time(value):
     """
@@ -583,31 +624,55 @@ def _cmd_to_str(cmd, arg):
         return "%s %s" % (cmd, arg)
     return cmd
 
+@functools.lru_cache(maxsize=None)
+def _build_ditt(pairs):
+    """
+    Build the data items translation tables for the '(human name, protocol name)' pairs in the
+    'pairs' tuple. Returns the '(htop, ptoh)' tuple of the human to protocol and protocol to human
+    name dictionaries. The tables are built once per power meter type and shared by all the power
+    meter objects of this type, so they must not be modified.
+    """
+
+    htop = {hname : pname for hname, pname in pairs}
+    ptoh = {pname : hname for hname, pname in pairs}
+    return htop, ptoh
+
 class YokoBase():
     """
     This is the base class for all power meters. Each specific type of power meter should be derived
     from this class.
     """
 
+    # The attributes are accessed on every command, and slots are faster than the instance
+    # dictionary. The derived classes have to declare the slots for their own attributes.
+    __slots__ = ("_transport", "_eesr_bits", "_htop", "_ptoh", "_commands", "_public_commands",
+                 "commands", "_items_to_read", "_item_indexes", "_data_items", "_vdata_items",
+                 "max_data_items", "_interval", "_errors_map", "_status_raw_cmd", "_deferred_cmds",
+                 "pipelined", "_pending_status", "_getter_cache", "_status_suffix")
+
     def _htop_tweak(self, _, value):
         """Translate data item in human notation to the protocol notation."""
-        return self._ditt["htop"].get(value, value)
+        return self._htop.get(value, value)
 
     def _ptoh_tweak(self, _, value):
         """Translate data item in protocol notation to the human notation."""
-        return self._ditt["ptoh"].get(value, value)
+        return self._ptoh.get(value, value)
 
-    def _add_choices_from_dict(self, cmd, choices_dict):
+    def _add_choices_from_dict(self, cmds, choices_dict):
         """
-        Add "choices" and "value-descr" for command 'cmd' from the the 'choices_dict' dictionary.
+        Add "choices" and "value-descr" for the commands in 'cmds' from the the 'choices_dict'
+        dictionary. The values are built once and shared by all the commands.
         """
 
-        self.commands[cmd]["choices"] = tuple(choices_dict)
+        choices = tuple(choices_dict)
+        choices_set = frozenset(choices)
+        descr = "\n".join(["%s - %s" % (name, descr) for name, descr in choices_dict.items()])
 
-        lines = []
-        for name, descr in choices_dict.items():
-            lines.append("%s - %s" % (name, descr))
-        self.commands[cmd]["value-descr"] = "\n".join(lines)
+        for cmd in cmds:
+            info = self._commands[cmd]
+            info["choices"] = choices
+            info["choices-set"] = choices_set
+            info["value-descr"] = descr
 
     def _iter_data_item_commands(self):
         """
@@ -618,7 +683,7 @@ class YokoBase():
     def _populate_choices(self, choices):
         """Populate the valid values for various WT310 commands to 'self.commands'."""
 
-        cmds = self.commands
+        cmds = self._public_commands
         for info in _CHOICES:
             for cmd in info["commands"]:
                 if cmd in cmds:
@@ -629,10 +694,8 @@ class YokoBase():
                 if cmd in cmds:
                     cmds[cmd]["choices"] = info["choices"]
 
-        self._add_choices_from_dict("read-data", self._data_items)
-        self._add_choices_from_dict("configure-data-items", self._data_items)
-        self._add_choices_from_dict("get-math", _MATH_NAMES)
-        self._add_choices_from_dict("set-math", _MATH_NAMES)
+        self._add_choices_from_dict(("read-data", "configure-data-items"), self._data_items)
+        self._add_choices_from_dict(("get-math", "set-math"), _MATH_NAMES)
 
         descr = "integer amount of seconds (0-10000 hours)"
         cmds["get-integration-timer"]["value-descr"] = descr
@@ -643,9 +706,16 @@ class YokoBase():
                 info["choices"] = None
                 info["choices-set"] = None
             if "choices-set" not in info:
-                info["choices-set"] = set(info["choices"])
+                info["choices-set"] = frozenset(info["choices"])
             if "value-descr" not in info:
                 info["value-descr"] = None
+            # Prepare the argument help text once instead of joining the choices on every request.
+            if info["value-descr"]:
+                info["argument-help"] = info["value-descr"]
+            elif info["choices"]:
+                info["argument-help"] = ", ".join(info["choices"])
+            else:
+                info["argument-help"] = None
 
     def _populate_data_items(self, items, pairs):
         """
@@ -653,33 +723,25 @@ class YokoBase():
         because often human name for the data item is different to the protocol name and we
         translate the name. This helper creates and returns the data item translation table, which
         is just a dictionary that can be used to quickly get human name by the protocol name and
-        vice versa.  The 'pairs' input argument is an iterable containing the (human name, protocol
+        vice versa.  The 'pairs' input argument is a tuple containing the (human name, protocol
         name) pairs.
         """
 
-        self._data_items = _DATA_ITEMS
-        for name, descr in items.items():
-            self._data_items[name] = descr
-        for name, descr in _VDATA_ITEMS.items():
-            self._data_items[name] = descr
+        # Note, the module-level dictionaries are shared by all the power meter objects, so copy.
+        self._data_items = OrderedDict(_DATA_ITEMS)
+        self._data_items.update(items)
+        self._data_items.update(_VDATA_ITEMS)
 
-        self._ditt = {}
-        self._ditt["htop"] = {}
-        self._ditt["ptoh"] = {}
-        for hname, pname in pairs:
-            self._ditt["htop"][hname] = pname
-            self._ditt["ptoh"][pname] = hname
+        self._htop, self._ptoh = _build_ditt(pairs)
 
     def _populate_raw_commands(self, raw_commands):
         """Populate the raw (wire) power meter commands to 'self._commands'."""
 
         for cmd, raw_cmd in _RAW_COMMANDS:
-            self._commands[cmd] = {}
-            self._commands[cmd]["raw-cmd"] = raw_cmd
+            self._commands.setdefault(cmd, {})["raw-cmd"] = raw_cmd
 
         for cmd, raw_cmd in raw_commands:
-            self._commands[cmd] = {}
-            self._commands[cmd]["raw-cmd"] = raw_cmd
+            self._commands.setdefault(cmd, {})["raw-cmd"] = raw_cmd
 
     def _populate_tweaks(self, tweaks):
         """
@@ -705,42 +767,90 @@ class YokoBase():
             self._commands[get_cmd]["response-tweaks"] = response_tweaks
             self._commands[set_cmd]["input-tweaks"] = input_tweaks
 
+        # Most commands have no tweaks, use an empty tuple for them so that applying tweaks does not
+        # require checking whether there are any.
+        for info in self._commands.values():
+            info.setdefault("response-tweaks", ())
+            info.setdefault("input-tweaks", ())
+            info.setdefault("input-tweak-raw", None)
+
     def _populate_arg_verify_funcs(self):
         """Populate arugment verification functions. They are executed before the command is run."""
 
         self._commands["set-integration-timer"]["verify-arg"] = _verify_integration_time
 
+    def _populate_flags(self):
+        """
+        Pack the command properties checked on every command into the "flags" integer. A command
+        needs its argument to be verified if it has a limited set of valid arguments or an argument
+        verification function. The public commands are the ones in 'self.commands'.
+        """
+
+        for cmd, info in self._commands.items():
+            flags = 0
+            if cmd in self._public_commands:
+                flags |= _IS_PUBLIC
+            if info["has-response"]:
+                flags |= _HAS_RESPONSE
+            if info["has-argument"]:
+                flags |= _HAS_ARGUMENT
+            if "func" in info:
+                flags |= _HAS_FUNC
+            if info.get("choices-set") or "verify-arg" in info:
+                flags |= _NEEDS_VERIFY
+            info["flags"] = flags
+
     def _add_command_func(self, cmd, func):
         """
         Some commands require a handler function, this helpers adds one to the internal
         'self._commands' dictionary.
         """
 
-        if cmd not in self._commands:
-            self._commands[cmd] = {}
-        if "raw-cmd" not in self._commands[cmd]:
-            self._commands[cmd]["raw-cmd"] = None
-        self._commands[cmd]["func"] = func
+        info = self._commands.setdefault(cmd, {})
+        info.setdefault("raw-cmd", None)
+        info["func"] = func
 
     def _populate_raw_commands_post(self):
         """Add post process and add common raw commands."""
 
         # Cover the EESR-related commands (one command per a EESR bit).
-        for name, bit in self._eesr_bits.items():
-            cmd = "set-eesr-filter-%s" % name
-            self._commands[cmd] = {}
-            self._commands[cmd]["raw-cmd"] = ":STAT:FILT%d" % (bit + 1)
-            cmd = "eesr-wait-%s" % name
-            self._commands[cmd] = {}
-            self._commands[cmd]["raw-cmd"] = ":COMM:WAIT %d" % (bit + 1)
+        bits = self._eesr_bits.items()
+        self._commands.update({_EESR_FILTER_CMDS[name] :
+                                   {"raw-cmd" : ":STAT:FILT%d" % (bit + 1)} for name, bit in bits})
+        self._commands.update({"eesr-wait-%s" % name :
+                                   {"raw-cmd" : ":COMM:WAIT %d" % (bit + 1)} for name, bit in bits})
 
         self._add_command_func("wait-data-update", self._wait_data_update_cmd)
+        self._add_command_func("wait-and-read-data", self._wait_and_read_data_cmd)
         self._add_command_func("get-current-range", self._get_range_cmd)
         self._add_command_func("set-current-range", self._set_range_cmd)
         self._add_command_func("get-voltage-range", self._get_range_cmd)
         self._add_command_func("set-voltage-range", self._set_range_cmd)
         self._add_command_func("start-integration", self._start_integration_cmd)
 
+        # Waiting for data update is done with a single compound message, and so is reading the data
+        # and checking the error status for "wait-and-read-data". The EESR is cleared by reading it,
+        # the "wait" command blocks the power meter until the data update finishes.
+        self._commands["wait-data-update"]["compound-raw-cmd"] = \
+            ";".join(self._commands[cmd]["raw-cmd"] for cmd in ("get-eesr", "eesr-wait-upd"))
+        self._commands["wait-and-read-data"]["compound-raw-cmd"] = \
+            ";".join(self._commands[cmd]["raw-cmd"] for cmd in ("get-eesr", "eesr-wait-upd",
+                                                                "read-data", "get-error-status"))
+
+        # The range commands need the corresponding auto-range command and the quantity name
+        # ("current" or "voltage"), compute them once instead of on every command.
+        for cmd in ("get-current-range", "set-current-range", "get-voltage-range",
+                    "set-voltage-range"):
+            self._commands[cmd]["auto-range-cmd"] = cmd.replace("-range", "-auto-range")
+            self._commands[cmd]["quantity"] = cmd.split("-")[1]
+
+        # The first and the last current/voltage range availability depends on the crest factor.
+        # Map these ranges to the (unsupported crest factor, needed crest factor) tuples.
+        for cmd in ("set-current-range", "set-voltage-range"):
+            choices = self._commands[cmd]["choices"]
+            self._commands[cmd]["crest-ranges"] = {choices[1] : ("3", "6"),
+                                                   choices[-1] : ("6", "3")}
+
         if hasattr(self._transport, "set_timeout"):
             self._add_command_func("set-interval", self._set_interval_timeout_cmd)
 
@@ -752,6 +862,43 @@ class YokoBase():
                 info["has-response"] = False
                 info["has-argument"] = True
 
+        # Mark the cacheable commands and the commands that invalidate the cached results.
+        for info in self._commands.values():
+            info["cacheable"] = False
+            info["invalidates"] = ()
+        for cmd in _CACHEABLE_COMMANDS:
+            if cmd in self._commands:
+                self._commands[cmd]["cacheable"] = True
+                set_cmd = "set-" + cmd[4:]
+                if set_cmd in self._commands:
+                    self._commands[set_cmd]["invalidates"] = (cmd,)
+        self._commands["factory-reset"]["invalidates"] = _CACHEABLE_COMMANDS
+
+        # Select the executor for every command, so that the command execution path does not have
+        # to figure out what needs to be done for the command every time. Also prepare the prefix
+        # for the raw commands with an argument, and the raw command followed by the error status
+        # query for the commands without an argument.
+        status_raw_cmd = self._commands["get-error-status"]["raw-cmd"]
+        for info in self._commands.values():
+            if info["raw-cmd"]:
+                info["raw-cmd-prefix"] = info["raw-cmd"] + " "
+                info["raw-cmd-status"] = info["raw-cmd"] + ";" + status_raw_cmd
+
+            if info["cacheable"]:
+                info["raw-executor"] = self._exec_cached_query
+            elif info["has-response"]:
+                info["raw-executor"] = self._exec_query
+            else:
+                info["raw-executor"] = self._exec_write
+
+            if "func" in info:
+                info["executor"] = self._exec_func
+            else:
+                info["executor"] = info["raw-executor"]
+
+            # Whether the command can be a part of a compound query by 'command_many()'.
+            info["batchable"] = info["has-response"] and "func" not in info
+
     def _populate_errors_map_map(self):
         """
         Error codes map mapes power meter error code number either to a human-readable message or to
@@ -811,13 +958,16 @@ class YokoBase():
         timestamp = time.time()
         items = []
 
+        # This runs for every data sample, so avoid the attribute lookups in the loop.
+        append = items.append
+        indexes = self._item_indexes
         for item in self._items_to_read:
             if item not in _VDATA_ITEMS:
-                items.append(response[self._item_indexes[item]])
+                append(response[indexes[item]])
             elif item == "T":
-                items.append(str(timestamp))
+                append(str(timestamp))
             elif item == "J":
-                items.append(str(float(response[self._item_indexes["P"]]) * self._interval))
+                append(str(float(response[indexes["P"]]) * self._interval))
 
         return items
 
@@ -847,14 +997,46 @@ class YokoBase():
     def _wait_data_update_cmd(self, _, __):
         """Wait until WT210 updates the data."""
 
-        # Note, we use 'check_status=False' in this function because the status check commands may
+        # Note, we do not check the status in this function because the status check commands may
         # take take long time in case of a low baud rate serial connection and we may be late when
         # the update interval is short.
 
-        # Clear EESR by reading it.
-        self._command("get-eesr", check_status=False)
-        # Wait for the event.
-        self._command("eesr-wait-upd", check_status=False)
+        # Clear EESR by reading it and wait for the event, using a single compound message.
+        raw_cmd = self._commands["wait-data-update"]["compound-raw-cmd"]
+        try:
+            self._transport.queryline(raw_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to run command 'wait-data-update':\n%s\nRaw command was '%s'"
+                            % (err, raw_cmd))
+
+    def _wait_and_read_data_cmd(self, cmd, _):
+        """
+        Wait until the power meter updates the data and read the data, which is the same as the
+        "wait-data-update" command followed by the "read-data" command, but costs a single
+        round-trip.
+        """
+
+        raw_cmd = self._commands[cmd]["compound-raw-cmd"]
+        try:
+            response = self._transport.queryline(raw_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to run command '%s':\n%s\nRaw command was '%s'"
+                            % (cmd, err, raw_cmd))
+
+        # The response is the EESR value, the data and the error status separated by semicolons.
+        _, sep1, response = response.partition(";")
+        response, sep2, status = response.rpartition(";")
+        if not sep1 or not sep2:
+            raise ErrorBadResponse(raw_cmd=raw_cmd, response=response)
+
+        # Skip the status parsing in the by far most common case of no error.
+        if not status.startswith("0,"):
+            msg = self._parse_error_status(cmd, None, status)
+            if msg:
+                raise Error(msg)
+
+        info = self._commands["read-data"]
+        return self._apply_response_tweaks("read-data", info, response)
 
     def _set_interval_timeout_cmd(self, _, arg):
         """Make sure transport device's timeout is larger than the interval."""
@@ -869,7 +1051,7 @@ class YokoBase():
         """Implements the 'get-current-range' and 'get-voltage-range' commands."""
 
         result = self._command(cmd, func=False)
-        auto = self._command(cmd.replace("-range", "-auto-range"))
+        auto = self._command(self._commands[cmd]["auto-range-cmd"])
 
         if auto == "on":
             result += " (auto)"
@@ -878,23 +1060,18 @@ class YokoBase():
     def _set_range_cmd(self, cmd, arg):
         """Implements the 'set-current-range' and 'set-voltage-range' commands."""
 
-        auto_range_cmd = cmd.replace("-range", "-auto-range")
+        auto_range_cmd = self._commands[cmd]["auto-range-cmd"]
         if arg == "auto":
             self._command(auto_range_cmd, "on")
             return
 
         self._command(auto_range_cmd, "off")
-        choices = self.commands[cmd]["choices"]
-        if arg in (choices[1], choices[-1]):
-            # The first and the last current/voltage range availability depends on the crest factor.
-            what = cmd.split("-")[1]
+        crest_range = self._commands[cmd]["crest-ranges"].get(arg)
+        if crest_range:
             crest = self._command("get-crest-factor")
-            crest_needed = None
-            if crest == "3" and arg == choices[1]:
-                crest_needed = "6"
-            elif crest == "6" and arg == choices[-1]:
-                crest_needed = "3"
-            if crest_needed:
+            bad_crest, crest_needed = crest_range
+            if crest == bad_crest:
+                what = self._commands[cmd]["quantity"]
                 raise Error("%s range %s is only available when crest factor is %s, but currently "
                             "it is %s" % (what, arg, crest_needed, crest))
 
@@ -911,76 +1088,122 @@ class YokoBase():
         self._command(cmd, func=False)
         time.sleep(0.2)
 
-    def _apply_response_tweaks(self, cmd, response):
+    @staticmethod
+    def _apply_response_tweaks(cmd, info, response):
         """
         Tweak 'response' as defined within a specific type of power meter, then return the tweaked
-        argument.
+        argument. The 'info' argument is the 'self._commands' entry of the 'cmd' command.
         """
 
-        if "response-tweaks" in self._commands[cmd]:
-            for tweak_func in self._commands[cmd]["response-tweaks"]:
-                response = tweak_func(cmd, response)
+        for tweak_func in info["response-tweaks"]:
+            response = tweak_func(cmd, response)
         return response
 
-    def _apply_input_tweaks(self, cmd, arg):
+    @staticmethod
+    def _apply_input_tweaks(cmd, info, arg):
         """
         Tweak 'input' as defined within a specific type of power meter, then return the tweaked
-        argument.
+        argument. The 'info' argument is the 'self._commands' entry of the 'cmd' command.
         """
 
-        if "input-tweaks" in self._commands[cmd]:
-            for tweak_func in self._commands[cmd]["input-tweaks"]:
-                arg = tweak_func(cmd, arg)
+        for tweak_func in info["input-tweaks"]:
+            arg = tweak_func(cmd, arg)
         return arg
 
-    def _verify_argument(self, cmd, arg):
-        """Verify whether or not 'arg' argument is valid for 'cmd' command."""
+    def _verify_argument(self, cmd, info, arg):
+        """
+        Verify whether or not 'arg' argument is valid for 'cmd' command. The 'info' argument is the
+        'self._commands' entry of the 'cmd' command.
+        """
 
-        choices = self.commands[cmd]["choices-set"]
+        choices = info["choices-set"]
         if choices:
             # 'arg' may be a list, in which case we check every element of the list.
             if isinstance(arg, (list, tuple)):
-                for elt in arg:
-                    tweaked_elt = self._apply_input_tweaks(cmd, elt)
-                    if tweaked_elt not in choices:
-                        raise ErrorBadArgument(cmd, elt)
+                elts = arg
+                if info["input-tweaks"]:
+                    elts = [self._apply_input_tweaks(cmd, info, elt) for elt in arg]
+                bad = set(elts) - choices
+                if bad:
+                    # Report the first bad element in the order the user specified them.
+                    raise ErrorBadArgument(cmd, next(elt for elt, tweaked_elt in zip(arg, elts)
+                                                     if tweaked_elt in bad))
             else:
-                tweaked_arg = self._apply_input_tweaks(cmd, arg)
+                tweaked_arg = self._apply_input_tweaks(cmd, info, arg)
                 if tweaked_arg not in choices:
                     raise ErrorBadArgument(cmd, arg)
 
-        if "verify-arg" in self._commands[cmd]:
-            func = self._commands[cmd]["verify-arg"]
-            if not func(arg):
-                raise ErrorBadArgument(cmd, arg)
+        func = info.get("verify-arg")
+        if func and not func(arg):
+            raise ErrorBadArgument(cmd, arg)
 
         return True
 
-    def _check_error_status(self, cmd, arg):
+    def _parse_error_status(self, cmd, arg, response):
         """
-        Check whether the power meter error status and possibly apply the error handlers. Returns
+        Parse the power meter error status 'response' and possibly apply the error handlers. Returns
         'None' if there were no errors (or the error was handled) and the error message otherwise.
         """
 
-        status_cmd = self._commands["get-error-status"]["raw-cmd"]
-        try:
-            response = self._transport.queryline(status_cmd)
-        except Transport.Error as err:
-            raise type(err)("failed to check error status of command '%s':\n%s\nRaw command was "
-                            "'%s'" % (_cmd_to_str(cmd, arg), err, status_cmd))
+        # This is the by far most common case, so handle it without parsing the response.
+        if response.startswith("0,"):
+            return None
+
+        msg = self._get_error_msg(cmd, arg, response)
+        if msg:
+            return "command '%s' failed:\n%s" % (_cmd_to_str(cmd, arg), msg)
+        return None
 
+    def _parse_compound_error_status(self, cmd, response):
+        """
+        Parse the error status 'response' of a group of commands executed with a single error
+        status check ('cmd' describes the group). The power meter reports only the oldest error in
+        its error queue, so if there was an error, keep reading the error status until the queue is
+        empty, otherwise the remaining errors would be reported for the next command. Returns
+        'None' if there were no errors (or all the errors were handled) and the message with all
+        the errors otherwise.
+        """
+
+        if response.startswith("0,"):
+            return None
+
+        msgs = []
+        for _ in range(_MAX_QUEUED_ERRORS):
+            msg = self._get_error_msg(cmd, None, response)
+            if msg:
+                msgs.append(msg)
+            response = self._query_error_status(cmd, None)
+            if response.startswith("0,"):
+                break
+
+        if msgs:
+            return "command '%s' failed:\n%s" % (cmd, "\n".join(msgs))
+        return None
+
+    def _get_error_msg(self, cmd, arg, response):
+        """
+        Return the error message for the non-zero error status 'response', or 'None' if there was no
+        error or the error was handled by an error handler.
+        """
+
+        code, sep, rawmsg = response.partition(",")
         try:
-            code, rawmsg = response.split(',', 1)
             code = int(code)
-        except ValueError as err:
-            raise ErrorBadResponse(raw_cmd=status_cmd, response=response)
+        except ValueError:
+            sep = None
+        if not sep:
+            raise ErrorBadResponse(raw_cmd=self._status_raw_cmd, response=response)
 
         if code == 0:
             return None
 
-        if code in self._errors_map:
-            if "func" in self._errors_map[code]:
-                msg = self._errors_map[code]["func"](cmd, arg, code, rawmsg)
+        entry = self._errors_map.get(code)
+        if entry is None:
+            msg = response
+        else:
+            func = entry.get("func")
+            if func:
+                msg = func(cmd, arg, code, rawmsg)
                 if not msg:
                     return None
                 if msg == "":
@@ -988,82 +1211,387 @@ class YokoBase():
                     # message and the default one should be used.
                     msg = response
             else:
-                msg = self._errors_map[code]["msg"]
-        else:
-            msg = response
+                msg = entry["msg"]
 
-        return "command '%s' failed:\n%s" % (_cmd_to_str(cmd, arg), msg)
+        return msg
 
-    def _command(self, cmd, arg=None, check_status=True, func=True):
+    def _query_error_status(self, cmd, arg):
+        """Query and return the power meter error status after command 'cmd'."""
+
+        status_cmd = self._status_raw_cmd
+        try:
+            return self._transport.queryline(status_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to check error status of command '%s':\n%s\nRaw command was "
+                            "'%s'" % (_cmd_to_str(cmd, arg), err, status_cmd))
+
+    def _command_compound(self, cmds):
         """
-        Actually execute the command, the tweaks, and the status checks, unless 'check_status' is
-        'False'. Some commands have both the "raw-cmd" and "func" keys in their 'self._command'
-        description, and the 'func' argument whether the function should be executed or the raw
-        command should be executed.
+        Execute the '(cmd, arg)' pairs from 'cmds' as a single compound program message followed by
+        a single error status check. This costs one round-trip instead of one per command and one
+        per status check. The commands must not have a response or a handler function. If some of
+        the commands fail, all the errors are reported together.
         """
 
-        _LOG.debug(_cmd_to_str(cmd, arg))
+        if self._pending_status is not None:
+            self.flush()
 
-        if func and "func" in self._commands[cmd]:
-            retval = self._commands[cmd]["func"](cmd, arg)
-            if retval is not _CMD_CONTINUE:
-                return retval
+        raw_cmds = []
+        for cmd, arg in cmds:
+            info = self._commands[cmd]
+            assert not info["flags"] & (_HAS_RESPONSE | _HAS_FUNC)
 
-        if arg is not None:
-            arg = self._apply_input_tweaks(cmd, arg)
+            if _LOG.isEnabledFor(logging.DEBUG):
+                _LOG.debug(_cmd_to_str(cmd, arg))
+            for name in info["invalidates"]:
+                self._getter_cache.pop(name, None)
 
-        raw_cmd = self._commands[cmd]["raw-cmd"]
-        if arg is not None:
-            raw_cmd += " %s" % arg
+            raw_cmds.append(self._build_raw_cmd(cmd, info, arg))
+
+        raw_cmds.append(self._status_raw_cmd)
+        raw_cmd = ";".join(raw_cmds)
+        what = "; ".join(_cmd_to_str(cmd, arg) for cmd, arg in cmds)
+
+        try:
+            response = self._transport.queryline(raw_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to run commands '%s':\n%s\nRaw command was '%s'"
+                            % (what, err, raw_cmd))
+
+        msg = self._parse_compound_error_status(what, response)
+        if msg:
+            raise Error(msg)
+
+    def _defer_status_checks(self):
+        """
+        Start deferring the error status checks of the commands without a response. The commands
+        are written to the power meter one after the other without waiting for the status, and the
+        status is checked only once by '_check_deferred_status()'. Only the commands without a
+        response should be executed until then.
+        """
+
+        self._deferred_cmds = []
+
+    def _check_deferred_status(self):
+        """
+        Stop deferring the error status checks and check the error status of all the commands
+        executed since '_defer_status_checks()' was called. If some of the commands failed, all the
+        errors are reported together.
+        """
+
+        cmds = self._deferred_cmds
+        self._deferred_cmds = None
+        if not cmds:
+            return
+
+        what = "; ".join(_cmd_to_str(cmd, arg) for cmd, arg in cmds)
+        msg = self._parse_compound_error_status(what, self._query_error_status(what, None))
+        if msg:
+            raise Error(msg)
+
+    def _build_raw_cmd(self, cmd, info, arg, suffix=""):
+        """
+        Apply the input tweaks to 'arg' and build the raw command for 'cmd'. The 'info' argument is
+        the 'self._commands' entry of the 'cmd' command. The 'suffix' string is appended to the raw
+        command.
+        """
+
+        if arg is None:
+            return info["raw-cmd"] + suffix
+
+        raw_tweak = info["input-tweak-raw"]
+        if raw_tweak:
+            return raw_tweak(info["raw-cmd"], arg) + suffix
+
+        # Most commands have no tweaks, so loop over them here rather than calling
+        # '_apply_input_tweaks()'.
+        for tweak_func in info["input-tweaks"]:
+            arg = tweak_func(cmd, arg)
+        if not isinstance(arg, str):
+            arg = str(arg)
+        return "".join((info["raw-cmd-prefix"], arg, suffix))
+
+    def _build_raw_cmd_status(self, cmd, info, arg):
+        """Same as '_build_raw_cmd()', but the raw command is followed by the error status query."""
 
+        if arg is None:
+            return info["raw-cmd-status"]
+        return self._build_raw_cmd(cmd, info, arg, self._status_suffix)
+
+    def _write_raw_cmd(self, cmd, info, arg):
+        """
+        Apply the input tweaks to 'arg', build the raw command and write it to the power meter.
+        Returns the raw command.
+        """
+
+        raw_cmd = self._build_raw_cmd(cmd, info, arg)
         try:
             self._transport.writeline(raw_cmd)
         except Transport.Error as err:
             raise type(err)("failed to write command '%s' to the power meter:\n%s\nRaw command "
                             "was '%s'" % (cmd, err, raw_cmd))
-        response = None
-        if self._commands[cmd]["has-response"]:
+        return raw_cmd
+
+    def _query_with_status(self, cmd, info, arg):
+        """
+        Send the raw command for 'cmd' and the error status query as a single compound program
+        message, which costs one round-trip instead of two. Returns the '(response, status)' tuple,
+        where 'response' is the response to the command ('None' if the command has no response)
+        and 'status' is the error status response.
+        """
+
+        raw_cmd = self._build_raw_cmd_status(cmd, info, arg)
+        try:
+            line = self._transport.queryline(raw_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to run command '%s':\n%s\nRaw command was '%s'"
+                            % (_cmd_to_str(cmd, arg), err, raw_cmd))
+
+        if not info["has-response"]:
+            return None, line
+
+        # The responses to the queries of a compound message are separated by semicolons. The
+        # response to the command itself may contain semicolons too, but the status response does
+        # not.
+        response, sep, status = line.rpartition(";")
+        if not sep:
+            # The power meter does not respond to a failed query, so check the status first.
+            msg = self._parse_error_status(cmd, arg, status)
+            if msg:
+                raise Error(msg)
+            raise ErrorBadResponse(raw_cmd=raw_cmd, response=line)
+        return response, status
+
+    def _exec_write(self, cmd, info, arg, check_status):
+        """The executor for the raw commands without a response."""
+
+        if not check_status:
+            self._write_raw_cmd(cmd, info, arg)
+            return
+
+        if self._deferred_cmds is not None:
+            self._write_raw_cmd(cmd, info, arg)
+            self._deferred_cmds.append((cmd, arg))
+            return
+
+        _, status = self._query_with_status(cmd, info, arg)
+        # Skip the status parsing in the by far most common case of no error.
+        if not status.startswith("0,"):
+            msg = self._parse_error_status(cmd, arg, status)
+            if msg:
+                raise Error(msg)
+
+    def _exec_query(self, cmd, info, arg, check_status):
+        """The executor for the raw commands that have a response."""
+
+        if check_status:
+            response, status = self._query_with_status(cmd, info, arg)
+            if not status.startswith("0,"):
+                msg = self._parse_error_status(cmd, arg, status)
+                if msg:
+                    raise Error(msg)
+        else:
+            raw_cmd = self._write_raw_cmd(cmd, info, arg)
             try:
                 response = self._transport.readline()
             except Transport.Error as err:
-                raise type(err)("failed to read power meter response to '%s':\n%s\nRaw command was "
-                                "'%s'" % (_cmd_to_str(cmd, arg), err, raw_cmd))
-            response = self._apply_response_tweaks(cmd, response)
+                raise type(err)("failed to read power meter response to '%s':\n%s\nRaw command "
+                                "was '%s'" % (_cmd_to_str(cmd, arg), err, raw_cmd))
 
-        if check_status:
-            msg = self._check_error_status(cmd, arg)
-            if msg:
-                raise Error(msg)
+        # Most commands have no tweaks, so loop over them here rather than calling
+        # '_apply_response_tweaks()'.
+        for tweak_func in info["response-tweaks"]:
+            response = tweak_func(cmd, response)
+        return response
 
+    def _exec_cached_query(self, cmd, info, arg, check_status):
+        """The executor for the raw commands that have a response which can be cached."""
+
+        response = self._getter_cache.get(cmd)
+        if response is None:
+            response = self._exec_query(cmd, info, arg, check_status)
+            self._getter_cache[cmd] = response
         return response
 
-    def command(self, cmd, arg=None):
+    def _exec_func(self, cmd, info, arg, check_status):
+        """The executor for the commands that have a handler function."""
+
+        retval = info["func"](cmd, arg)
+        if retval is not _CMD_CONTINUE:
+            return retval
+        return info["raw-executor"](cmd, info, arg, check_status)
+
+    def _command(self, cmd, arg=None, check_status=True, func=True):
         """
-        Execute the power meter command 'cmd' with argument 'arg' if it is not null. Return the
-        command response or 'None' if the command has no response. 'cmd' should be a string, 'arg'
-        can be of any type since 'command()' handles the typecast to string.
+        Actually execute the command, the tweaks, and the status checks, unless 'check_status' is
+        'False'. Some commands have both the "raw-cmd" and "func" keys in their 'self._command'
+        description, and the 'func' argument whether the function should be executed or the raw
+        command should be executed.
+
+        The work specific to a command is done by its executor, which was selected for the command
+        when the commands dictionary was populated.
+        """
+
+        # Avoid formatting the command string when debug messages are not going to be printed.
+        if _LOG.isEnabledFor(logging.DEBUG):
+            _LOG.debug(_cmd_to_str(cmd, arg))
+
+        if self._pending_status is not None:
+            self.flush()
+
+        info = self._commands[cmd]
+        for name in info["invalidates"]:
+            self._getter_cache.pop(name, None)
+
+        if func:
+            return info["executor"](cmd, info, arg, check_status)
+        return info["raw-executor"](cmd, info, arg, check_status)
+
+    def configure_eesr(self, **filters):
+        """
+        Configure the transition filters of multiple EESR bits at once. The keyword argument names
+        are the EESR bit names (e.g., 'upd') and the values are the filters ("rise", "fall", "both"
+        or "never"). The power meter has no command for writing all the filters as a single mask,
+        so all the filter commands are sent as a single compound message, which costs one
+        round-trip regardless of the number of bits. The error status is checked once for the
+        whole group, so if some of the filters could not be set, the errors are reported together
+        for all the filter commands.
         """
 
-        if not isinstance(cmd, str) or cmd not in self.commands:
-            raise Error("bad command '%s'" % cmd)
+        cmds = []
+        for name, value in filters.items():
+            cmd = _EESR_FILTER_CMDS.get(name)
+            if cmd is None:
+                raise ErrorBadArgument(None, None, msg="bad EESR bit name '%s'" % name)
+            if value not in _EESR_FILTERS:
+                raise ErrorBadArgument(None, None, msg="bad EESR filter '%s' for bit '%s', use "
+                                       "one of: %s" % (value, name, ", ".join(_EESR_FILTERS)))
+            cmds.append((cmd, value))
 
-        # We allow 'arg' to be of different types and convert it into a string
+        if cmds:
+            self._command_compound(cmds)
+
+    def flush(self):
+        """
+        Check the error status of the last command without a response in the pipelined mode. In
+        this mode the status of such a command is read only when the next command is executed, so
+        call this method to find out whether the last command succeeded.
+        """
+
+        pending = self._pending_status
+        if pending is None:
+            return
+
+        self._pending_status = None
+        cmd, arg, raw_cmd = pending
+        try:
+            response = self._transport.readline()
+        except Transport.Error as err:
+            raise type(err)("failed to check error status of command '%s':\n%s\nRaw command was "
+                            "'%s'" % (_cmd_to_str(cmd, arg), err, raw_cmd))
+
+        msg = self._parse_error_status(cmd, arg, response)
+        if msg:
+            raise Error(msg)
+
+    def _check_command(self, cmd, arg):
+        """
+        Validate the command 'cmd' and its argument 'arg', and return 'arg' converted to a string
+        (or to a list of strings).
+        """
+
+        # A single lookup both checks that the command exists and that it is public.
+        info = self._commands.get(cmd) if isinstance(cmd, str) else None
+        if info is None or not info["flags"] & _IS_PUBLIC:
+            raise ErrorBadCommand(cmd)
+
+        # We allow 'arg' to be of different types and convert it into a string. Note, lists are
+        # copied rather than modified in place in order to leave the caller's list intact.
         if arg is not None:
             if isinstance(arg, list):
-                for idx, item in enumerate(arg):
-                    if not isinstance(item, str):
-                        arg[idx] = str(item)
+                if any(not isinstance(item, str) for item in arg):
+                    arg = [item if isinstance(item, str) else str(item) for item in arg]
             elif not isinstance(arg, str):
                 arg = str(arg)
 
         # Sanity checks.
-        if self._commands[cmd]["has-argument"]:
-            self._verify_argument(cmd, arg)
+        flags = info["flags"]
+        if flags & _HAS_ARGUMENT:
+            if flags & _NEEDS_VERIFY:
+                self._verify_argument(cmd, info, arg)
         elif arg is not None:
             raise Error("command '%s' accepts no arguments, but '%s' was provided" % (cmd, arg))
 
+        return arg
+
+    def command(self, cmd, arg=None):
+        """
+        Execute the power meter command 'cmd' with argument 'arg' if it is not null. Return the
+        command response or 'None' if the command has no response. 'cmd' should be a string, 'arg'
+        can be of any type since 'command()' handles the typecast to string.
+        """
+
+        arg = self._check_command(cmd, arg)
+        if self.pipelined:
+            info = self._commands[cmd]
+            if not info["flags"] & (_HAS_RESPONSE | _HAS_FUNC):
+                self._command_pipelined(cmd, info, arg)
+                return None
         return self._command(cmd, arg)
 
+    def _command_pipelined(self, cmd, info, arg):
+        """
+        Execute command 'cmd' without a response and without a handler function in the pipelined
+        mode: send the status query too, but read the status only when the next command is executed
+        (or 'flush()' is called). Only the commands executed by 'command()' are pipelined, the
+        commands executed by the handler functions must have their status checked right away,
+        because the handlers may rely on the errors (e.g., 'get-integration-state' on WT210).
+        """
+
+        if _LOG.isEnabledFor(logging.DEBUG):
+            _LOG.debug(_cmd_to_str(cmd, arg))
+
+        if self._pending_status is not None:
+            self.flush()
+
+        for name in info["invalidates"]:
+            self._getter_cache.pop(name, None)
+
+        raw_cmd = self._build_raw_cmd_status(cmd, info, arg)
+        try:
+            self._transport.writeline(raw_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to write command '%s' to the power meter:\n%s\nRaw "
+                            "command was '%s'" % (cmd, err, raw_cmd))
+        self._pending_status = (cmd, arg, raw_cmd)
+
+    def command_batch(self, cmds):
+        """
+        Execute the '(cmd, arg)' pairs from 'cmds' in order and return the list of their responses
+        ('None' for the commands without a response). All the commands are validated before any of
+        them is executed. The consecutive commands that have no response and no handler function
+        are executed as a single compound program message followed by a single error status check,
+        the other commands are executed one by one.
+        """
+
+        cmds = [(cmd, self._check_command(cmd, arg)) for cmd, arg in cmds]
+
+        results = []
+        batch = []
+        for cmd, arg in cmds:
+            if self._commands[cmd]["flags"] & (_HAS_RESPONSE | _HAS_FUNC):
+                if batch:
+                    self._command_compound(batch)
+                    batch = []
+                results.append(self._command(cmd, arg))
+            else:
+                batch.append((cmd, arg))
+                results.append(None)
+
+        if batch:
+            self._command_compound(batch)
+        return results
+
     def reset(self, configure=True):
         """
         Reset the power meter and if 'configure' is 'True', also configure with reasonable defaults.
@@ -1075,24 +1603,89 @@ class YokoBase():
         if not configure:
             return
 
-        # Set crest factor to 3 for better measurement precision.
-        self.command("set-crest-factor", "3")
-        # We are measuring AC, so need the RMS mode.
-        self.command("set-measurement-mode", "rms")
-        # Autmatically find the suitable voltage and current ranges.
-        self.command("set-voltage-auto-range", "on")
-        self.command("set-current-auto-range", "on")
-        # Set the measurement interval to 1 second.
-        self.command("set-interval", 1)
-        # Disable line filer to inclue all the frequencies into the measurements.
-        self.command("set-line-filter", "off")
-        # Enable the frequency filter. It only affects frequency measurements and generally
-        # recommended to be enabled.
-        self.command("set-freq-filter", "on")
+        self.command_batch((
+            # Set crest factor to 3 for better measurement precision.
+            ("set-crest-factor", "3"),
+            # We are measuring AC, so need the RMS mode.
+            ("set-measurement-mode", "rms"),
+            # Autmatically find the suitable voltage and current ranges.
+            ("set-voltage-auto-range", "on"),
+            ("set-current-auto-range", "on"),
+            # Set the measurement interval to 1 second.
+            ("set-interval", 1),
+            # Disable line filer to inclue all the frequencies into the measurements.
+            ("set-line-filter", "off"),
+            # Enable the frequency filter. It only affects frequency measurements and generally
+            # recommended to be enabled.
+            ("set-freq-filter", "on"),
+        ))
+
+    def command_many(self, cmds):
+        """
+        Execute the commands in the 'cmds' list and return the list of their responses. The commands
+        must not require an argument. The commands that have a response and no handler function are
+        executed as a single compound query followed by a single error status check, the other
+        commands are executed one by one.
+        """
+
+        results = [None] * len(cmds)
+        batch = []
+        for idx, cmd in enumerate(cmds):
+            info = self._commands.get(cmd) if isinstance(cmd, str) else None
+            if info is None or not info["flags"] & _IS_PUBLIC:
+                raise ErrorBadCommand(cmd)
+            if info["batchable"] and cmd not in self._getter_cache:
+                batch.append(idx)
+            else:
+                results[idx] = self.command(cmd)
+
+        if not batch:
+            return results
+
+        if self._pending_status is not None:
+            self.flush()
+
+        raw_cmds = []
+        for idx in batch:
+            if _LOG.isEnabledFor(logging.DEBUG):
+                _LOG.debug(cmds[idx])
+            raw_cmds.append(self._commands[cmds[idx]]["raw-cmd"])
+        raw_cmds.append(self._status_raw_cmd)
+        raw_cmd = ";".join(raw_cmds)
+        what = "; ".join(cmds[idx] for idx in batch)
+
+        try:
+            response = self._transport.queryline(raw_cmd)
+        except Transport.Error as err:
+            raise type(err)("failed to run commands '%s':\n%s\nRaw command was '%s'"
+                            % (what, err, raw_cmd))
+
+        # The responses to the queries of a compound message are separated by semicolons. The power
+        # meter does not respond to a failed query, so check the status first.
+        responses = response.split(";")
+        msg = self._parse_compound_error_status(what, responses[-1])
+        if msg:
+            raise Error(msg)
+        if len(responses) != len(raw_cmds):
+            raise ErrorBadResponse(raw_cmd=raw_cmd, response=response)
+
+        for idx, response in zip(batch, responses):
+            cmd = cmds[idx]
+            info = self._commands[cmd]
+            response = self._apply_response_tweaks(cmd, info, response)
+            if info["cacheable"]:
+                self._getter_cache[cmd] = response
+            results[idx] = response
+
+        return results
 
     def _init_pmeter(self):
         """Initialize the power meter."""
 
+        # The error status is checked after almost every command, so save its raw command.
+        self._status_raw_cmd = self._commands["get-error-status"]["raw-cmd"]
+        self._status_suffix = ";" + self._status_raw_cmd
+
         # Clear the output and error queues of the power meter. The first command may fail with the
         # "interrupted" error if the power meter is currently expencting the results of the previous
         # command to be read, so clear 2 times.
@@ -1101,15 +1694,18 @@ class YokoBase():
         except Error:
             self._command("clear")
 
+        # The power meter executes the commands in order, so there is no need to wait for the status
+        # of every configuration command.
+        self._defer_status_checks()
         # Make sure that in case of error the device sends verbose error strings, not just the
         # status code.
         self._command("set-verbose-errors", "on")
         # Disable headers in responses.
         self._command("set-headers", "off")
+        self._check_deferred_status()
 
         # Clear all the EESR trigger conditions.
-        for name in self._eesr_bits:
-            self._command("set-eesr-filter-%s" % name, "never")
+        self.configure_eesr(**dict.fromkeys(self._eesr_bits, "never"))
 
     def __init__(self, transport):
         """The class constructor. The 'transport' argument is the power meter transport object."""
@@ -1117,12 +1713,17 @@ class YokoBase():
         self._transport = transport
         self._eesr_bits = _EESR_BITS
 
-        # The data items translation table.
-        self._ditt = None
-        # Create the user-visible commands dictionary.
-        self.commands = COMMANDS
-        # The private commands dictionary.
-        self._commands = {}
+        # The data items translation tables: human to protocol and protocol to human names.
+        self._htop = None
+        self._ptoh = None
+        # The commands dictionary. Each command is described by a dictionary which contains both the
+        # user-visible information (description, choices, etc) and the private information needed
+        # for executing the command (raw command, tweaks, etc).
+        self._commands = OrderedDict((cmd, dict(info)) for cmd, info in COMMANDS.items())
+        # The user-visible commands and the read-only view of them. The command description
+        # dictionaries are shared with 'self._commands'.
+        self._public_commands = OrderedDict(self._commands)
+        self.commands = MappingProxyType(self._public_commands)
         # List of items configured to be read by 'configure-data-items'.
         self._items_to_read = []
         # Indexes of the data items that we are reading.
@@ -1137,6 +1738,20 @@ class YokoBase():
         self._interval = None
         # Messages and actions in case power meter reports and error.
         self._errors_map = None
+        # The raw command for reading the power meter error status.
+        self._status_raw_cmd = None
+        # The error status query to append to a raw command in a compound program message.
+        self._status_suffix = None
+        # The commands with deferred error status checks, 'None' if the checks are not deferred.
+        self._deferred_cmds = None
+        # Whether the error status of the commands without a response should be read only when the
+        # next command is executed or 'flush()' is called. This lets the caller do other work while
+        # the power meter executes the command. Note, an error is then reported by the next command.
+        self.pipelined = False
+        # The '(cmd, arg, raw_cmd)' tuple for the command which error status was not read yet.
+        self._pending_status = None
+        # Cached results of the cacheable commands.
+        self._getter_cache = {}
 
     def __del__(self):
         """The class destructor."""
@@ -1150,5 +1765,8 @@ class YokoBase():
         """Close the communication interface with the power meter."""
 
         if getattr(self, "_transport", None):
-            self._transport.close()
+            try:
+                self.flush()
+            finally:
+                self._transport.close()
             self._transport = None
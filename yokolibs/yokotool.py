@@ -23,17 +23,21 @@ import os
 import sys
 import time
 import logging
+import functools
 import argparse
 import textwrap
-import subprocess
 
-try:
-    import argcomplete
-except ImportError:
-    argcomplete = None
+# The modules that are needed only by some of the commands are imported when they are needed, which
+# makes the tool start faster. The 'argcomplete' module is needed only for shell completion.
+argcomplete = None
+if "_ARGCOMPLETE" in os.environ:
+    try:
+        import argcomplete
+    except ImportError:
+        pass
 
-from yokolibs import Transport, PowerMeter, Helpers, Config, Logging
-from yokolibs.Exceptions import Error, ErrorDeviceNotFound, TransportError
+from yokolibs import Helpers, Config, Logging
+from yokolibs.Exceptions import Error, ErrorBadCommand, ErrorDeviceNotFound, TransportError
 
 VERSION = "2.2"
 OWN_NAME = "yokotool"
@@ -41,7 +45,8 @@ OWN_NAME = "yokotool"
 LOG = logging.getLogger()
 
 # The commands supported by this tool.
-CMDLINE_COMMANDS = ("info", "read", "get", "set", "integration", "calibrate", "factory-reset")
+CMDLINE_COMMANDS = frozenset(("info", "read", "get", "set", "integration", "calibrate",
+                              "factory-reset"))
 
 # The sub-commands of the 'get' command that map directly to a "raw" command.
 GET_SUBCOMMANDS = ("id", "installed-opts", "wiring-system")
@@ -52,31 +57,59 @@ GETSET_SUBCOMMANDS = ("current-range", "voltage-range", "interval", "current-aut
                       "smoothing-type", "smoothing-factor", "math", "line-filter", "freq-filter",
                       "sync-source", "max-hold", "hold", "remote-mode", "local-mode")
 
+# The sub-commands of the 'get' and 'set' commands, for membership checks.
+GET_CHOICES = frozenset(GETSET_SUBCOMMANDS + GET_SUBCOMMANDS)
+SET_CHOICES = frozenset(GETSET_SUBCOMMANDS)
+
+@functools.lru_cache(maxsize=None)
+def _get_parser_spec(name):
+    """
+    Return the '(name, text, descr)' tuple for the 'get' and 'set' sub-command 'name', where 'text'
+    is the short help text and 'descr' is the description of the sub-command. The result is cached,
+    because the 'get' and 'set' commands share most of the sub-commands.
+    """
+
+    from yokolibs import PowerMeter # pylint: disable=import-outside-toplevel
+
+    info = PowerMeter.COMMANDS["get-" + name]
+    return (name, info["property-descr"].capitalize() + ".", info["descr"].capitalize() + ".")
+
+def _get_parser_specs(names):
+    """Return a tuple of '(name, text, descr)' tuples for the sub-commands in 'names'."""
+
+    return tuple(_get_parser_spec(name) for name in names)
+
 # This data structure describes the subcommands of 'integration' command.
 # * name - name of the subcommand.
-# * command - corresponding power meter's command (if any).
-# * help - short/one line subcommand description.
+# * command - corresponding power meter's command ('None' for the 'wait' subcommand, which polls
+#             the integration state instead).
+# * check-timer - whether the integration timer and mode have to be checked before running the
+#                 command.
 # * descr - description of the subcommand.
 INTEGRATION_SUBCMDS = (
     {
-        "name"    : "wait",
-        "command" : "start-integration",
-        "descr"   : "Wait for integration to finish.",
+        "name"        : "wait",
+        "command"     : None,
+        "check-timer" : False,
+        "descr"       : "Wait for integration to finish.",
     },
     {
-        "name"    : "start",
-        "command" : "start-integration",
-        "descr"   : "Start integration.",
+        "name"        : "start",
+        "command"     : "start-integration",
+        "check-timer" : True,
+        "descr"       : "Start integration.",
     },
     {
-        "name"    : "stop",
-        "command" : "stop-integration",
-        "descr"   : "Stop integration.",
+        "name"        : "stop",
+        "command"     : "stop-integration",
+        "check-timer" : False,
+        "descr"       : "Stop integration.",
     },
     {
-        "name"    : "reset",
-        "command" : "reset-integration",
-        "descr"   : "Reset integration.",
+        "name"        : "reset",
+        "command"     : "reset-integration",
+        "check-timer" : False,
+        "descr"       : "Reset integration.",
     },
 )
 
@@ -160,16 +193,18 @@ def inject_default_subparser(subname, where, choices, anyway=False):
     injected.
     """
 
-    if "-h" in sys.argv:
+    argv = sys.argv
+    if "-h" in argv:
         return
 
     idx = argv_idx = where_idx = 0
+    where_len = len(where)
     found = False
-    for idx, arg in enumerate(sys.argv):
+    for idx, arg in enumerate(argv):
         # Skip options, we are only interested in positional arguments.
         if arg.startswith("-"):
             continue
-        if where_idx < len(where):
+        if where_idx < where_len:
             if arg == where[where_idx]:
                 where_idx += 1
                 argv_idx = idx
@@ -181,14 +216,14 @@ def inject_default_subparser(subname, where, choices, anyway=False):
             found = True
             break
 
-    if anyway and where_idx >= len(where):
+    if anyway and where_idx >= where_len:
         found = True
 
     if not found:
         return
 
-    sys.argv.insert(argv_idx + 1, subname)
-    LOG.debug("changed cmdline: %s", " ".join(sys.argv))
+    argv.insert(argv_idx + 1, subname)
+    LOG.debug("changed cmdline: %s", " ".join(argv))
 
 def parse_arguments():
     """Parse the input arguments."""
@@ -220,6 +255,14 @@ def parse_arguments():
     subpars = pars.add_subparsers(title="supported commands", metavar="")
     subpars.required = True
 
+    # Creating the sub-parsers of the 'get', 'set' and 'integration' commands takes most of the
+    # time, so create them only when the command is on the command line (shell completion needs all
+    # of them).
+    if "_ARGCOMPLETE" in os.environ:
+        wanted = CMDLINE_COMMANDS
+    else:
+        wanted = CMDLINE_COMMANDS.intersection(sys.argv)
+
     # Create a parser for the 'info' command.
     text = "Print device information."
     descr = "Print information about the power meter."
@@ -265,22 +308,19 @@ def parse_arguments():
     subpars1 = pars1.add_subparsers(title="properties", metavar="")
     subpars1.required = True
 
-    for name in GETSET_SUBCOMMANDS + GET_SUBCOMMANDS:
-        info = PowerMeter.COMMANDS["get-%s" % name]
-        text = info["property-descr"].capitalize() + "."
-        descr = info["descr"].capitalize() + "."
-        pars2 = subpars1.add_parser(name, help=text, description=descr)
-        pars2.set_defaults(name=name)
+    if "get" in wanted:
+        for name, text, descr in _get_parser_specs(GETSET_SUBCOMMANDS + GET_SUBCOMMANDS):
+            pars2 = subpars1.add_parser(name, help=text, description=descr)
+            pars2.set_defaults(name=name)
+            pars2.set_defaults(func=get_command)
+
+        # Other properties. We add the "other" subcommand, but it is hidden from the users.
+        inject_default_subparser("other", ["get"], GET_CHOICES, anyway=True)
+        pars2 = subpars1.add_parser("other")
+        text = "Print full list of available properties."
+        pars2.add_argument("--list", action="store_true", help=text)
         pars2.set_defaults(func=get_command)
-
-    # Other properties. We add the "other" subcommand, but it is hidden from the users.
-    choices = GETSET_SUBCOMMANDS + GET_SUBCOMMANDS + ("current-range", "voltage-range")
-    inject_default_subparser("other", ["get"], choices, anyway=True)
-    pars2 = subpars1.add_parser("other")
-    text = "Print full list of available properties."
-    pars2.add_argument("--list", action="store_true", help=text)
-    pars2.set_defaults(func=get_command)
-    pars2.add_argument("name", nargs="?")
+        pars2.add_argument("name", nargs="?")
 
     # Create a parser for the 'set' command.
     text = "Set a property."
@@ -291,25 +331,21 @@ def parse_arguments():
     subpars1 = pars1.add_subparsers(title="properties", metavar="")
     subpars1.required = True
 
-    for name in GETSET_SUBCOMMANDS:
-        info = PowerMeter.COMMANDS["get-%s" % name]
-        text = info["property-descr"].capitalize() + "."
-        descr = info["descr"].capitalize() + "."
-        pars2 = subpars1.add_parser(name, help=text, description=descr)
-        pars2.set_defaults(name=name)
+    if "set" in wanted:
+        for name, text, descr in _get_parser_specs(GETSET_SUBCOMMANDS):
+            pars2 = subpars1.add_parser(name, help=text, description=descr)
+            pars2.set_defaults(name=name)
+            pars2.set_defaults(func=set_command)
+            pars2.add_argument("arg", nargs="?", help=text)
+
+        # Other properties. We add the "other" subcommand, but it is hidden from the users.
+        inject_default_subparser("other", ["set"], SET_CHOICES, anyway=True)
+        pars2 = subpars1.add_parser("other")
+        text = "Print full list of available properties."
+        pars2.add_argument("--list", action="store_true", help=text)
         pars2.set_defaults(func=set_command)
-        text = info["property-descr"].capitalize() + "."
-        pars2.add_argument("arg", nargs="?", help=text)
-
-    # Other properties. We add the "other" subcommand, but it is hidden from the users.
-    choices = GETSET_SUBCOMMANDS + ("current-range", "voltage-range")
-    inject_default_subparser("other", ["set"], choices, anyway=True)
-    pars2 = subpars1.add_parser("other")
-    text = "Print full list of available properties."
-    pars2.add_argument("--list", action="store_true", help=text)
-    pars2.set_defaults(func=set_command)
-    pars2.add_argument("name", nargs="?")
-    pars2.add_argument("arg", nargs="?")
+        pars2.add_argument("name", nargs="?")
+        pars2.add_argument("arg", nargs="?")
 
     # Create a parser for the 'integration' command.
     text = "Integration commands."
@@ -318,23 +354,23 @@ def parse_arguments():
     subpars1 = pars1.add_subparsers(title="subcommands", metavar="")
     subpars1.required = True
 
-    for subcmd in INTEGRATION_SUBCMDS:
-        pars2 = subpars1.add_parser(subcmd["name"], help=subcmd["descr"],
-                                    description=subcmd["descr"])
-        if subcmd["name"] == "wait":
-            pars2.set_defaults(func=integration_wait_subcommand)
-        else:
-            pars2.set_defaults(subcmd=subcmd)
-            pars2.set_defaults(func=integration_subcommands)
-
-    for prop in INTEGRATION_PROPERTIES:
-        pars2 = subpars1.add_parser(prop["name"], help=prop["descr"],
-                                    description=prop["descr"])
-        if prop["name"] in ("mode", "timer"):
-            text = "The value to assign to 'integration %s'." % prop["name"]
-            pars2.add_argument("value", nargs="?", help=text)
-        pars2.set_defaults(prop=prop)
-        pars2.set_defaults(func=integration_properties)
+    if "integration" in wanted:
+        for subcmd in INTEGRATION_SUBCMDS:
+            pars2 = subpars1.add_parser(subcmd["name"], help=subcmd["descr"],
+                                        description=subcmd["descr"])
+            if subcmd["command"]:
+                pars2.set_defaults(subcmd=subcmd, func=integration_subcommands)
+            else:
+                pars2.set_defaults(func=integration_wait_subcommand)
+
+        for prop in INTEGRATION_PROPERTIES:
+            pars2 = subpars1.add_parser(prop["name"], help=prop["descr"],
+                                        description=prop["descr"])
+            if prop["name"] in ("mode", "timer"):
+                text = "The value to assign to 'integration %s'." % prop["name"]
+                pars2.add_argument("value", nargs="?", help=text)
+            pars2.set_defaults(prop=prop)
+            pars2.set_defaults(func=integration_properties)
 
     # Create a parser for the 'calibrate' command.
     text = "Execute zero-level compensation."
@@ -359,26 +395,19 @@ def parse_arguments():
 def info_command(_, pmeter):
     """Implements the 'info' command."""
 
-    for cmd, info in PowerMeter.COMMANDS.items():
-        if not cmd.startswith("get-"):
-            continue
-        result = pmeter.command(cmd)
-        LOG.info("%s: %s", info["property-descr"].capitalize(), result)
+    cmds = [cmd for cmd in pmeter.commands if cmd.startswith("get-")]
+    for cmd, result in zip(cmds, pmeter.command_many(cmds)):
+        LOG.info("%s: %s", pmeter.commands[cmd]["property-descr"].capitalize(), result)
+
+# The text wrapper for the properties list.
+_PROPERTIES_WRAPPER = textwrap.TextWrapper(width=79, initial_indent=" * ", subsequent_indent="   ")
 
 def _print_properties(pmeter, pfx):
     """Print available properties with the 'pfx' prefix."""
 
-    wrapper = textwrap.TextWrapper(width=79)
-    wrapper.initial_indent = " * "
-    wrapper. subsequent_indent = "   "
-    lines = []
-
-    for cmd, info in pmeter.commands.items():
-        if not cmd.startswith(pfx):
-            continue
-        lines += wrapper.wrap("%s - %s" % (cmd[4:], info["descr"]))
-
-    LOG.info("\n".join(lines))
+    fill = _PROPERTIES_WRAPPER.fill
+    LOG.info("\n".join(fill("%s - %s" % (cmd[4:], info["descr"]))
+                       for cmd, info in pmeter.commands.items() if cmd.startswith(pfx)))
 
 def get_command(args, pmeter):
     """Implements the 'get <something>' command."""
@@ -390,10 +419,10 @@ def get_command(args, pmeter):
     if not args.name:
         raise Error("please, specify the property to get, use -h for help")
 
-    cmd = "get-%s" % args.name
-    if cmd not in pmeter.commands:
+    try:
+        LOG.info(pmeter.command("get-" + args.name))
+    except ErrorBadCommand:
         raise Error("unknown power meter property '%s'" % args.name)
-    LOG.info(pmeter.command("get-%s" % args.name))
 
 def set_command(args, pmeter):
     """Implements the 'set <something>' command."""
@@ -405,13 +434,14 @@ def set_command(args, pmeter):
     if not args.name:
         raise Error("please, specify the property to set, use -h for help")
 
-    cmd = "set-%s" % args.name
+    cmd = "set-" + args.name
     if not args.arg:
         LOG.info("Use:\n%s", pmeter.get_argument_help(cmd))
     else:
-        if cmd not in pmeter.commands:
-            raise Error("unknown power meter property '%s'" % (args.name))
-        pmeter.command(cmd, args.arg)
+        try:
+            pmeter.command(cmd, args.arg)
+        except ErrorBadCommand:
+            raise Error("unknown power meter property '%s'" % args.name)
     return
 
 def read_command(args, pmeter):
@@ -442,51 +472,96 @@ def read_command(args, pmeter):
 
     proc = None
     if args.command:
+        import subprocess # pylint: disable=import-outside-toplevel
+
         try:
             proc = subprocess.Popen(args.command)
         except OSError as err:
             raise Error("cannot run '%s':\n%s" % (" ".join(args.command), err))
         LOG.debug("started: %s", " ".join(args.command))
 
-    # We keep the max. lengths of printed items in this dictionary in order to aling the output.
-    maxlens = {idx : 0 for idx in range(len(ditems))}
+    # We keep the max. lengths of printed items in this list in order to aling the output.
+    maxlens = [0] * len(ditems)
+
+    def format_aligned(data):
+        """Format the 'data' row aligning the items to the widest ones printed so far."""
+
+        print_data = []
+        append = print_data.append
+        for idx, item in enumerate(data[:-1]):
+            maxlen = maxlens[idx]
+            if len(item) > maxlen:
+                maxlens[idx] = maxlen = len(item)
+            append((item + ",").ljust(maxlen + 1))
+        append(data[-1])
+        return " ".join(print_data)
+
+    # Pick the row formatting function once, instead of checking the option for every row.
+    if args.no_align:
+        format_row = ",".join
+    else:
+        format_row = format_aligned
     count = 0
-    start_time = time.time()
-
-    while True:
-        if proc:
-            exitcode = proc.poll()
-            if exitcode is not None:
-                LOG.debug("the executed process exited with code %d", exitcode)
-                break
-
-        if not ignore_integration:
-            if pmeter.command("get-integration-state") != "start":
-                LOG.debug("integration finished, exiting")
-                break
-
-        if time_limit is not None and time.time() - start_time > time_limit:
-            LOG.debug("%s second(s) read time is out, exiting", time_limit)
-            break
-
-        if count_limit is not None and count >= count_limit:
-            LOG.debug("read %d sample(s), exiting", count_limit)
-            break
-
-        pmeter.command("wait-data-update")
-        data = pmeter.command("read-data")
-        count += 1
+    start_time = time.monotonic()
+    deadline = None
+    if time_limit is not None:
+        deadline = start_time + time_limit
+    # The integration state is checked at most once per 'integ_check_period' seconds instead of
+    # before every read, which saves a round-trip per sample at short intervals. The integration
+    # timer has 1 second resolution, so the period is 1 second too. The price is that up to 1
+    # second of samples may be read after integration finishes.
+    integ_check_time = start_time
+    integ_check_period = 1
+    # Whether there are any conditions to stop reading on, otherwise read until interrupted.
+    check_stop = proc or not ignore_integration or deadline is not None or count_limit is not None
+
+    # The measurement data are written directly to the output stream instead of being logged. The
+    # stream is flushed at most once a second (unless it is line-buffered, like a terminal). The
+    # data are printed only if 'INFO' messages are enabled (e.g., not with '-q'), like the header.
+    stream = args.info_stream
+    write = stream.write
+    show_data = LOG.isEnabledFor(logging.INFO)
+    flush_time = start_time
 
-        if args.no_align:
-            LOG.info(",".join(data))
-        else:
-            print_data = []
-            for idx in range(len(data) -1):
-                maxlens[idx] = max(maxlens[idx], len(data[idx]))
-                fmt = "%%-%ds" % (maxlens[idx] + 1)
-                print_data.append(fmt % (data[idx] + ","))
-            print_data.append(data[-1])
-            LOG.info(" ".join(print_data))
+    try:
+        while True:
+            # Check the stop conditions, the cheapest ones first.
+            if check_stop:
+                if count_limit is not None and count >= count_limit:
+                    LOG.debug("read %d sample(s), exiting", count_limit)
+                    break
+
+                now = time.monotonic()
+                if deadline is not None and now > deadline:
+                    LOG.debug("%s second(s) read time is out, exiting", time_limit)
+                    break
+
+                if proc:
+                    exitcode = proc.poll()
+                    if exitcode is not None:
+                        LOG.debug("the executed process exited with code %d", exitcode)
+                        break
+
+                if not ignore_integration and now - integ_check_time >= integ_check_period:
+                    integ_check_time = now
+                    if pmeter.command("get-integration-state") != "start":
+                        LOG.debug("integration finished, exiting")
+                        break
+
+            data = pmeter.command("wait-and-read-data")
+            count += 1
+
+            if not show_data:
+                continue
+
+            write(format_row(data) + "\n")
+
+            now = time.monotonic()
+            if now - flush_time >= 1:
+                stream.flush()
+                flush_time = now
+    finally:
+        stream.flush()
 
 def integration_wait_subcommand(_, pmeter):
     """
@@ -504,9 +579,9 @@ def integration_subcommands(args, pmeter):
     """This function runs the subcommands of 'integration' command."""
 
     # Integration cannot start in 'continuous' mode when 'timer' is not set.
-    if args.subcmd["name"] == "start":
-        integ_timer = pmeter.command("get-integration-timer")
-        integ_mode = pmeter.command("get-integration-mode")
+    if args.subcmd["check-timer"]:
+        integ_timer, integ_mode = pmeter.command_many(("get-integration-timer",
+                                                       "get-integration-mode"))
         if integ_timer == "0" and integ_mode == "continuous":
             LOG.error("Please, set a timer value higher than '%s' to start integration in "
                       "'%s' mode.", integ_timer, integ_mode)
@@ -595,12 +670,19 @@ def main():
     # Configure the logger.
     info_stream = sys.stdout
     if args.outfile:
+        # The 'read' command may write a lot of data and flushes the stream itself, so give it a
+        # large buffer. The other commands write little, so make their output appear right away.
+        if args.func is read_command:
+            buffering = 1024 * 1024
+        else:
+            buffering = 1
         try:
-            info_stream = open(args.outfile, "w+")
+            info_stream = open(args.outfile, "w+", buffering=buffering)
         except OSError as err:
             raise Error("cannot open the output file '%s':\n%s" % (args.outfile, err))
 
     Logging.setup_logger(prefix=OWN_NAME, info_stream=info_stream)
+    args.info_stream = info_stream
 
     args.devnode = args.secname = None
     if devspec:
@@ -630,6 +712,8 @@ def main():
         # Auto-detection is not 100% reliable, so print a warning.
         LOG.warning("power meter type was not specified, trying to auto-detect it")
 
+    from yokolibs import Transport, PowerMeter # pylint: disable=import-outside-toplevel
+
     transport = Transport.Transport(**config)
 
     try:
@@ -656,6 +740,9 @@ def main():
         LOG.error_out(err)
     except KeyboardInterrupt:
         LOG.info("Interrupted, exiting")
+    finally:
+        if info_stream is not sys.stdout:
+            info_stream.close()
 
     return 0
 